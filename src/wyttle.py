@@ -1,9 +1,14 @@
 import os
+import sys
 import json
 import re
+import functools
 from pathlib import Path
 import shutil
+import tempfile
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import http.server
 import socketserver
 import threading
@@ -14,13 +19,42 @@ from watchdog.events import FileSystemEventHandler
 from csscompressor import compress as css_compress
 from rjsmin import jsmin
 import socket
-import uuid
+import selectors
+import base64
+import hashlib
 import logging
 
+try:
+    import liburing
+except ImportError:
+    liburing = None
+
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+# Precompiled patterns shared by every processed page
+# Robust regex to handle various link tag formats
+_LINK_RE = re.compile(
+    r'<link\s+(?=[^>]*href=["\'][^"\']*["\'])(?=[^>]*rel=["\']stylesheet["\'])[^>]*?href=["\']([^"\']+)["\'][^>]*?>',
+    re.IGNORECASE | re.DOTALL,
+)
+_SCRIPT_RE = re.compile(
+    r'<script\s+[^>]*?src=["\'](.*?)["\'][^>]*?></script>', re.IGNORECASE | re.DOTALL
+)
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_INCLUDE_RE = re.compile(r"<%@\s*([^>]+?)\s*%>", re.DOTALL)
+_TEMPLATE_RE = re.compile(r"<template:([^>]+)>(.*?)</template:\1>", re.DOTALL)
+_JS_OPEN_RE = re.compile(r"<([a-zA-Z]+)[^>]*>%%")
+_RESIDUAL_RE = re.compile(r"<template:[^>]+ />|<%%\s*/>", re.DOTALL)
+_WS_KEY_RE = re.compile(rb"^Sec-WebSocket-Key:\s*(\S+)", re.IGNORECASE | re.MULTILINE)
+
+# Below this many pages a process pool costs more to start than it saves
+_PARALLEL_MIN_PAGES = 16
+
+# Submission queue depth for batched io_uring page reads
+_URING_DEPTH = 256
+
 
 def load_config(config_path):
     """Load the wyttle.config.json file."""
@@ -31,38 +65,84 @@ def load_config(config_path):
         return {}
 
 
+@functools.lru_cache(maxsize=2048)
+def _is_file(path_str):
+    """Cached regular-file check; cleared along with the other file caches."""
+    return os.path.isfile(path_str)
+
+
+def _join_ref(file_ref, current_file):
+    """Return the normalized path a reference points at, whether or not it exists."""
+    return os.path.normpath(os.path.join(os.path.dirname(current_file), file_ref))
+
+
+def _normalize_path(file_ref, current_file):
+    """Lexically join a reference onto the current file's directory.
+
+    Symlinks are not resolved, which saves an lstat per path component.
+    """
+    resolved_path = _join_ref(file_ref, current_file)
+    return Path(resolved_path) if _is_file(resolved_path) else None
+
+
 def resolve_inline_path(file_ref, current_file):
     """Resolve the path of a local CSS or JS file."""
-    current_dir = Path(current_file).parent
-    try:
-        resolved_path = (current_dir / file_ref).resolve()
-        return resolved_path if resolved_path.exists() else None
-    except (FileNotFoundError, OSError):
-        return None
+    return _normalize_path(file_ref, current_file)
+
+
+def _file_mtime(file_path):
+    """Return the modification time of a file in nanoseconds."""
+    return os.stat(file_path).st_mtime_ns
+
+
+@functools.lru_cache(maxsize=512)
+def _read_cached(path_str, mtime):
+    """Read a file; keyed on mtime so edits invalidate the cached entry."""
+    return Path(path_str).read_bytes().decode("utf-8")
+
+
+# Minifier results are keyed by source text, so assets shared between pages
+# (or identical inline snippets) are minified once and never go stale
+@functools.lru_cache(maxsize=256)
+def _minify_css(css_content):
+    return css_compress(css_content)
+
+
+@functools.lru_cache(maxsize=512)
+def _minify_js(js_content):
+    return jsmin(js_content)
+
+
+def clear_file_caches():
+    """Drop all cached existence checks and file contents."""
+    _is_file.cache_clear()
+    _read_cached.cache_clear()
 
 
 def load_file_content(file_path):
     """Read content of a file."""
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return f.read()
+        return _read_cached(str(file_path), _file_mtime(file_path))
     except FileNotFoundError:
         return None
 
 
-def inline_css(content, file_path):
+def inline_css(content, file_path, dependencies=None):
     """Inline local CSS files and minify."""
 
     def css_repl(match):
         href = match.group(1).strip()
         if href.startswith(("http", "//")):
             return match.group(0)  # Keep external URLs
+        if dependencies is not None:
+            # Recorded even when missing, so creating the file triggers a rebuild
+            dependencies.add(Path(_join_ref(href, file_path)))
         css_path = resolve_inline_path(href, file_path)
         if css_path:
             css_content = load_file_content(css_path)
             if css_content:
                 try:
-                    minified_css = css_compress(css_content)
+                    minified_css = _minify_css(css_content)
                     return f"<style>{minified_css}</style>"
                 except Exception as e:
                     logging.error(f"CSS compression failed for {css_path}: {e}")
@@ -72,137 +152,166 @@ def inline_css(content, file_path):
             logging.warning(f"CSS file not found: {href}")
         return match.group(0)  # Preserve original tag if file not found
 
-    # Robust regex to handle various link tag formats
-    return re.sub(
-        r'<link\s+(?=[^>]*href=["\'][^"\']*["\'])(?=[^>]*rel=["\']stylesheet["\'])[^>]*?href=["\']([^"\']+)["\'][^>]*?>',
-        css_repl,
-        content,
-        flags=re.IGNORECASE | re.DOTALL,
-    )
+    return _LINK_RE.sub(css_repl, content)
 
 
-def inline_js(content, file_path):
+def inline_js(content, file_path, dependencies=None):
     """Inline local JS files and minify."""
 
     def js_repl(match):
         src = match.group(1).strip()
         if src.startswith(("http", "//")):
             return match.group(0)  # Keep external URLs
+        if dependencies is not None:
+            # Recorded even when missing, so creating the file triggers a rebuild
+            dependencies.add(Path(_join_ref(src, file_path)))
         js_path = resolve_inline_path(src, file_path)
         if js_path:
             js_content = load_file_content(js_path)
             if js_content:
-                minified_js = jsmin(js_content)
+                minified_js = _minify_js(js_content)
                 return f"<script>{minified_js}</script>"
             logging.warning(f"JS file empty: {src}")
         else:
             logging.warning(f"JS file not found: {src}")
         return match.group(0)  # Preserve original tag if file not found
 
-    return re.sub(
-        r'<script\s+[^>]*?src=["\'](.*?)["\'][^>]*?></script>',
-        js_repl,
-        content,
-        flags=re.IGNORECASE | re.DOTALL,
-    )
+    return _SCRIPT_RE.sub(js_repl, content)
 
 
 def minify_html(content, remove_empty_space=True, remove_comments=True):
     if remove_comments:
-        content = re.sub(r"<!--.*?-->", "", content, flags=re.DOTALL)
+        content = _COMMENT_RE.sub("", content)
 
     if remove_empty_space:
-        content = re.sub(r"\s+", " ", content)
-        content = re.sub(r">\s+<", "><", content)
-        content = content.strip()
+        # str.split() collapses whitespace runs and strips both ends in one C-level scan
+        content = " ".join(content.split())
+        content = content.replace("> <", "><")
 
     return content
 
 
 def resolve_template_path(template_ref, current_file):
-    """Resolve the relative path of a template include."""
-    match = re.match(r"<%@\s*(.*?)\s*%>", template_ref)
-    if not match:
-        return None
-    template_path = match.group(1).strip()
-    current_dir = Path(current_file).parent
-    try:
-        resolved_path = (current_dir / template_path).resolve()
-        return resolved_path if resolved_path.exists() else None
-    except (FileNotFoundError, OSError):
-        return None
+    """Resolve the relative path of a template include (the path inside <%@ ... %>)."""
+    return _normalize_path(template_ref, current_file)
+
+
+@functools.lru_cache(maxsize=256)
+def _template_pattern(keys):
+    """Compile a single alternation matching the placeholders for all keys."""
+    # Handle <template:key>...</template:key>, <template:key /> and a bare
+    # <template:key>; the block form is tried first so it replaces the default text,
+    # but its body may not run past another opener of the same key
+    alternation = "|".join(re.escape(key) for key in sorted(keys))
+    return re.compile(
+        rf"<template:({alternation})"
+        rf"(?:>(?:(?!<template:\1[\s/>]).)*?</template:\1>| />|>)",
+        re.DOTALL,
+    )
 
 
 def process_template(content, template_data):
     """Replace template placeholders with provided data."""
-    for key, value in template_data.items():
-        # Handle both <template:key>...</template:key> and <template:key />
-        placeholder = f"<template:{key}(?:>| />)"
-        content = re.sub(placeholder, value, content, flags=re.DOTALL)
-        # Clean up any closing tags if they exist
-        content = re.sub(f"</template:{key}>", "", content, flags=re.DOTALL)
-    return content
+    if not template_data:
+        return content
+    pattern = _template_pattern(frozenset(template_data))
+    return pattern.sub(lambda match: template_data[match.group(1)], content)
 
 
 def process_js_blocks(content):
     """Convert %%...%% JS blocks into script tags with data-wyttle-ref."""
 
-    def replace_js_block(match):
-        js_code = match.group(2).strip()
+    # Every block ends in a "%%</" terminator, so this bounds the number of blocks
+    max_blocks = content.count("%%</")
+    if not max_blocks:
+        return content
+    # Draw all element ids from a single urandom call; they only serve as DOM selectors
+    random_ids = os.urandom(16 * max_blocks).hex()
+    block_count = 0
+
+    # Find each opener with a regex, then its terminator with a literal search,
+    # avoiding a backreference that forces the regex engine to backtrack
+    parts = []
+    pos = search_from = 0
+    unterminated = set()
+    while match := _JS_OPEN_RE.search(content, search_from):
         element_tag = match.group(1)
-        unique_id = str(uuid.uuid4())
-        minified_js = jsmin(js_code)
+        terminator = f"%%</{element_tag}>"
+        end = -1
+        if element_tag not in unterminated:
+            end = content.find(terminator, match.end())
+        if end == -1:
+            # No terminator later in the content, so this tag can never close
+            unterminated.add(element_tag)
+            search_from = match.start() + 1
+            continue
+
+        js_code = content[match.end() : end].strip()
+        unique_id = random_ids[32 * block_count : 32 * (block_count + 1)]
+        block_count += 1
+        minified_js = _minify_js(js_code)
         script = f'<script>document.querySelector("[data-wyttle-ref=\\"{unique_id}\\"]").textContent = {minified_js};</script>'
-        return f'<{element_tag} data-wyttle-ref="{unique_id}">{script}</{element_tag}>'
+        parts.append(content[pos : match.start()])
+        parts.append(
+            f'<{element_tag} data-wyttle-ref="{unique_id}">{script}</{element_tag}>'
+        )
+        pos = search_from = end + len(terminator)
 
-    return re.sub(
-        r"<([a-zA-Z]+)[^>]*>%%(.*?)%%</\1>", replace_js_block, content, flags=re.DOTALL
-    )
+    parts.append(content[pos:])
+    return "".join(parts)
 
 
-def process_file(file_path, output_dir, minify=True):
-    """Process a single HTML file, handling includes, templates, JS blocks, CSS, and JS."""
-    with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read()
+def _output_path(file_path, pages_root, dist_path):
+    """Map a page under src/pages to its location in the dist directory."""
+    return dist_path / file_path.relative_to(pages_root)
 
-    # Find all template includes
-    includes = re.findall(r"<%@\s*[^>]+%>", content, re.DOTALL)
-    template_data = {}
 
-    # Extract template data (e.g., <template:title>...</template:title>)
-    template_matches = re.findall(
-        r"<template:([^>]+)>(.*?)</template:\1>", content, re.DOTALL
-    )
+def process_file(file_path, output_path, minify=True, source=None, inject_reload=""):
+    """Process a single HTML file, handling includes, templates, JS blocks, CSS, and JS.
 
-    # Store template data and remove template tags from content
-    for key, value in template_matches:
-        template_data[key] = value.strip()
-        content = re.sub(
-            f"<template:{key}>.*?</template:{key}>", "", content, flags=re.DOTALL
-        )
+    `source` may hold the already-read bytes of the page, and `inject_reload` is a
+    live-reload script spliced in before </body>. Returns the set of template, CSS,
+    and JS paths the page references, including ones that did not resolve.
+    """
+    dependencies = set()
+    if source is None:
+        source = Path(file_path).read_bytes()
+    content = source.decode("utf-8")
+
+    template_data = {}
 
-    # Process includes
-    for include in includes:
-        template_path = resolve_template_path(include, file_path)
-        if template_path and template_path.exists():
+    # Extract template data (e.g., <template:title>...</template:title>)
+    # and remove the template tags from content in the same pass
+    def collect_template(match):
+        template_data[match.group(1)] = match.group(2).strip()
+        return ""
+
+    content = _TEMPLATE_RE.sub(collect_template, content)
+
+    # Process includes, splicing every template in during a single scan
+    def include_repl(match):
+        include, template_ref = match.group(0), match.group(1)
+        dependencies.add(Path(_join_ref(template_ref, file_path)))
+        template_path = resolve_template_path(template_ref, file_path)
+        if template_path:
             template_content = load_file_content(template_path)
             if template_content:
-                processed_template = process_template(template_content, template_data)
-                content = content.replace(include, processed_template)
-            else:
-                logging.warning(f"Template content empty: {include}")
-        else:
-            logging.warning(f"Template not found: {include}")
-            content = content.replace(include, "")  # Remove invalid include
+                return process_template(template_content, template_data)
+            logging.warning(f"Template content empty: {include}")
+            return include
+        logging.warning(f"Template not found: {include}")
+        return ""  # Remove invalid include
+
+    content = _INCLUDE_RE.sub(include_repl, content)
 
     # Remove residual tags (e.g., <%% />, self-closing templates)
-    content = re.sub(r"<template:[^>]+ />|<%%\s*/>", "", content, flags=re.DOTALL)
+    content = _RESIDUAL_RE.sub("", content)
 
     # Inline and minify CSS
-    content = inline_css(content, file_path)
+    content = inline_css(content, file_path, dependencies)
 
     # Inline and minify JS
-    content = inline_js(content, file_path)
+    content = inline_js(content, file_path, dependencies)
 
     # Process %%...%% JavaScript blocks
     content = process_js_blocks(content)
@@ -211,37 +320,165 @@ def process_file(file_path, output_dir, minify=True):
     if minify:
         content = minify_html(content, remove_empty_space=True, remove_comments=True)
 
-    # Write to output directory
-    relative_path = file_path.relative_to(file_path.parents[1])
-    output_path = output_dir / relative_path
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(content)
+    if inject_reload:
+        content = content.replace("</body>", f"{inject_reload}</body>")
+
+    # Write to output directory (created up front by the caller)
+    output_path.write_bytes(content.encode("utf-8"))
+
+    return dependencies
+
+
+def _make_output_dirs(output_paths):
+    """Create every output directory once instead of once per page."""
+    output_dirs = {output_path.parent for output_path in output_paths}
+    for output_dir in sorted(output_dirs):
+        os.makedirs(output_dir, exist_ok=True)
 
 
-def build_project(src_dir, dist_dir, config, minify=True):
-    """Build the project by processing all HTML files."""
+def _iter_html(root):
+    """Recursively yield HTML files under root using os.scandir."""
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_html(entry.path)
+            elif entry.name.endswith(".html"):
+                yield Path(entry.path)
+
+
+def _read_pages_uring(paths):
+    """Read all pages through io_uring, submitting up to _URING_DEPTH reads at once."""
+    ring = liburing.Ring()
+    cqe = liburing.Cqe()
+    liburing.io_uring_queue_init(_URING_DEPTH, ring)
+    sources = [None] * len(paths)
+    try:
+        for start in range(0, len(paths), _URING_DEPTH):
+            fds = []
+            try:
+                for path in paths[start : start + _URING_DEPTH]:
+                    fds.append(os.open(path, os.O_RDONLY))
+                buffers = [bytearray(os.fstat(fd).st_size) for fd in fds]
+                for offset, (fd, buffer) in enumerate(zip(fds, buffers)):
+                    sqe = liburing.io_uring_get_sqe(ring)
+                    liburing.io_uring_prep_read(sqe, fd, buffer, 0)
+                    liburing.io_uring_sqe_set_data64(sqe, offset)
+                liburing.io_uring_submit(ring)
+
+                # Reap every completion before the buffers and fds go away
+                error = None
+                for _ in fds:
+                    liburing.io_uring_wait_cqe(ring, cqe)
+                    offset, result = cqe[0].user_data, cqe[0].res
+                    liburing.io_uring_cq_advance(ring, 1)
+                    path = paths[start + offset]
+                    if result < 0:
+                        error = OSError(-result, os.strerror(-result), str(path))
+                    # Short reads are left as None and re-read synchronously
+                    elif result == len(buffers[offset]):
+                        sources[start + offset] = bytes(buffers[offset])
+                if error:
+                    raise error
+            finally:
+                for fd in fds:
+                    os.close(fd)
+    finally:
+        liburing.io_uring_queue_exit(ring)
+    return sources
+
+
+def _read_pages(paths):
+    """Batch-read page sources via io_uring when enabled, else defer reads to process_file."""
+    if liburing and sys.platform == "linux" and os.getenv("WYTTLE_IO_URING"):
+        try:
+            return _read_pages_uring(paths)
+        except Exception as e:
+            logging.warning(f"io_uring read failed, falling back to regular reads: {e}")
+    return [None] * len(paths)
+
+
+def _pool_workers(files, parallel):
+    """Return the process pool size for a build, or 0 to process pages serially."""
+    if not parallel or len(files) < _PARALLEL_MIN_PAGES:
+        return 0
+    max_workers = min(len(files), os.cpu_count() or 1)
+    return max_workers if max_workers > 1 else 0
+
+
+def _process_pages(files, output_paths, minify, sources, reload_scripts, parallel):
+    """Process pages, returning the dependencies of each in order."""
+    args = (files, output_paths, repeat(minify), sources, reload_scripts)
+
+    # Pages are independent, so large sites are spread across processes
+    max_workers = _pool_workers(files, parallel)
+    if max_workers:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(process_file, *args))
+    return list(map(process_file, *args))
+
+
+def _replace_dist(build_path, dist_path):
+    """Swap a finished build into place and delete the old output in the background."""
+    if not dist_path.exists():
+        os.rename(build_path, dist_path)
+        return
+
+    # Park the old tree in a unique directory so back-to-back builds never collide
+    trash_path = Path(
+        tempfile.mkdtemp(prefix=f".{dist_path.name}.old-", dir=dist_path.parent)
+    )
+    os.rename(dist_path, trash_path / dist_path.name)
+    os.rename(build_path, dist_path)
+    # Not a daemon, so a one-off CLI build still finishes the cleanup before exiting
+    threading.Thread(
+        target=shutil.rmtree, args=(trash_path,), kwargs={"ignore_errors": True}
+    ).start()
+
+
+def build_project(
+    src_dir, dist_dir, config, minify=True, inject_reload="", parallel=True
+):
+    """Build the project by processing all HTML files.
+
+    `parallel` allows a process pool for large sites; callers running alongside
+    other threads pass False, since forking a multi-threaded process can deadlock.
+    Returns a mapping of each absolute page path to the files it depends on.
+    """
     src_path = Path(src_dir)
     dist_path = Path(dist_dir)
 
-    # Clean the dist directory
-    if dist_path.exists():
-        shutil.rmtree(dist_path)
-    dist_path.mkdir(parents=True)
+    # Build into a fresh sibling directory, swapped in once every page succeeded
+    build_path = dist_path.with_name(dist_path.name + ".new")
+    if build_path.exists():
+        shutil.rmtree(build_path)  # Left over from an interrupted build
+    build_path.mkdir(parents=True)
 
     # Walk through src directory
-    for root, _, files in os.walk(src_path / "pages"):
-        for file in files:
-            if file.endswith(".html"):
-                file_path = Path(root) / file
-                process_file(file_path, dist_path, minify)
+    pages_root = Path(os.path.abspath(src_path / "pages"))
+    files = list(_iter_html(pages_root)) if pages_root.is_dir() else []
+    output_paths = [_output_path(f, pages_root, build_path) for f in files]
+    index_page = pages_root / "index.html"
+    reload_scripts = [inject_reload if f == index_page else "" for f in files]
+
+    # Pool workers read their own pages; shipping pre-read bytes to them through
+    # the pool's pipe would cost more than the batched read saves
+    if _pool_workers(files, parallel):
+        sources = [None] * len(files)
+    else:
+        sources = _read_pages(files)
+
+    try:
+        _make_output_dirs(output_paths)
+        dependencies = _process_pages(
+            files, output_paths, minify, sources, reload_scripts, parallel
+        )
+    except BaseException:
+        shutil.rmtree(build_path, ignore_errors=True)
+        raise
+
+    _replace_dist(build_path, dist_path)
 
-    # Move pages to root
-    pages_path = dist_path / "pages"
-    if pages_path.exists():
-        for file in pages_path.iterdir():
-            shutil.move(str(file), str(dist_path))
-        shutil.rmtree(pages_path)
+    return dict(zip(files, dependencies))
 
 
 class DevServerHandler(http.server.SimpleHTTPRequestHandler):
@@ -253,80 +490,258 @@ class DevServerHandler(http.server.SimpleHTTPRequestHandler):
 
     def translate_path(self, path):
         path = urlparse(path).path
-        path = Path(self.dist_dir) / path.lstrip("/")
-        return str(path)
+        return os.path.join(self.dist_dir, path.lstrip("/"))
+
+    def copyfile(self, source, outputfile):
+        # Let the kernel copy file bodies straight to the socket
+        if outputfile is self.wfile:
+            self.connection.sendfile(source)
+        else:
+            super().copyfile(source, outputfile)
 
 
 class FileWatcher(FileSystemEventHandler):
-    """Watch for file changes and rebuild project."""
+    """Watch for file changes and rebuild affected pages."""
+
+    debounce_delay = 0.1
 
-    def __init__(self, src_dir, dist_dir, config):
+    def __init__(
+        self, src_dir, dist_dir, config, dependencies=None, reload_server=None
+    ):
         self.src_dir = src_dir
         self.dist_dir = dist_dir
         self.config = config
+        self.dependencies = dependencies
+        self.reload_server = reload_server
+        self.pages_root = Path(os.path.abspath(Path(src_dir) / "pages"))
+        self._changed = set()
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._timer = None
 
     def on_any_event(self, event):
         if event.is_directory or event.src_path.endswith(".config.json"):
             return
+        if event.event_type in ("opened", "closed_no_write"):
+            return  # Reads (including our own builds) don't change anything
         logging.info(f"Change detected: {event.src_path}")
-        build_project(self.src_dir, self.dist_dir, self.config, minify=False)
+
+        # Coalesce bursts of events (e.g. editor save sequences) into one rebuild
+        with self._lock:
+            self._changed.add(Path(os.path.abspath(event.src_path)))
+            if getattr(event, "dest_path", ""):
+                self._changed.add(Path(os.path.abspath(event.dest_path)))
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce_delay, self._rebuild)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _affected_pages(self, changed):
+        """Return the pages to reprocess, or None if a full rebuild is needed."""
+        if self.dependencies is None:
+            return None
+        dependents = {}
+        for page, deps in self.dependencies.items():
+            for dep in deps:
+                dependents.setdefault(dep, set()).add(page)
+
+        pages = set()
+        for path in changed:
+            is_page = path.suffix == ".html" and path.is_relative_to(self.pages_root)
+            if is_page and (path not in self.dependencies or not path.exists()):
+                return None  # A page was added or removed
+            # A page can also be included by other pages, so check both roles
+            if path in self.dependencies:
+                pages.add(path)
+            # Other files (editor swap files, backups, ...) affect no output
+            pages.update(dependents.get(path, ()))
+        return pages
+
+    def _rebuild(self):
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            self._timer = None
+
+        # A slow build can overlap the next debounced rebuild, so run them one at a time
+        with self._build_lock:
+            rebuilt = self._rebuild_pages(changed)
+
+        if rebuilt and self.reload_server:
+            self.reload_server.notify_reload()
+
+    def _rebuild_pages(self, changed):
+        """Rebuild whatever the changed paths affect; return False if nothing was."""
+        clear_file_caches()
+        inject_reload = self.reload_server.script if self.reload_server else ""
+        pages = self._affected_pages(changed)
+        if not pages and pages is not None:
+            return False
+        if pages is None:
+            self.dependencies = build_project(
+                self.src_dir,
+                self.dist_dir,
+                self.config,
+                minify=False,
+                inject_reload=inject_reload,
+                parallel=False,
+            )
+        else:
+            logging.info(f"Rebuilding {len(pages)} affected page(s)")
+            dist_path = Path(self.dist_dir)
+            index_page = self.pages_root / "index.html"
+            output_paths = {
+                page: _output_path(page, self.pages_root, dist_path) for page in pages
+            }
+            _make_output_dirs(output_paths.values())
+            for page, output_path in output_paths.items():
+                self.dependencies[page] = process_file(
+                    page,
+                    output_path,
+                    minify=False,
+                    inject_reload=inject_reload if page == index_page else "",
+                )
+        return True
+
+
+class ReloadServer:
+    """Minimal single-threaded WebSocket server that tells open pages to reload."""
+
+    GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+    # FIN + text opcode, unmasked 6-byte payload
+    RELOAD_FRAME = b"\x81\x06reload"
+    MAX_HANDSHAKE = 8192
+
+    def __init__(self, port):
+        self.port = port
+        self.script = f"""
+    <script>
+    let ws = new WebSocket(`ws://${{location.hostname}}:{port}`);
+    ws.onmessage = () => location.reload();
+    </script>
+    """
+        self._selector = selectors.DefaultSelector()
+        self._handshakes = {}
+        self._clients = set()
+        self._wake_recv, self._wake_send = socket.socketpair()
+
+    def start(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(("localhost", self.port))
+        server.listen()
+        server.setblocking(False)
+        self._wake_recv.setblocking(False)
+        self._selector.register(server, selectors.EVENT_READ, self._accept)
+        self._selector.register(self._wake_recv, selectors.EVENT_READ, self._broadcast)
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def notify_reload(self):
+        """Ask every connected page to reload; safe to call from any thread."""
+        self._wake_send.send(b"\0")
+
+    def _serve(self):
+        while True:
+            for key, _ in self._selector.select():
+                key.data(key.fileobj)
+
+    def _accept(self, server):
+        conn, _ = server.accept()
+        conn.setblocking(False)
+        self._handshakes[conn] = b""
+        self._selector.register(conn, selectors.EVENT_READ, self._read)
+
+    def _read(self, conn):
+        try:
+            data = conn.recv(4096)
+        except OSError:
+            data = b""
+        if not data:
+            self._close(conn)
+            return
+        if conn in self._clients:
+            return  # Frames sent by the page carry nothing we need
+
+        request = self._handshakes[conn] + data
+        if b"\r\n\r\n" not in request:
+            if len(request) > self.MAX_HANDSHAKE:
+                self._close(conn)
+            else:
+                self._handshakes[conn] = request
+            return
+
+        del self._handshakes[conn]
+        match = _WS_KEY_RE.search(request)
+        if not match:
+            self._close(conn)
+            return
+        accept = base64.b64encode(hashlib.sha1(match.group(1) + self.GUID).digest())
+        try:
+            conn.sendall(
+                b"HTTP/1.1 101 Switching Protocols\r\n"
+                b"Upgrade: websocket\r\n"
+                b"Connection: Upgrade\r\n"
+                b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+            )
+        except OSError:
+            self._close(conn)
+            return
+        self._clients.add(conn)
+
+    def _broadcast(self, wake):
+        wake.recv(4096)
+        for conn in list(self._clients):
+            try:
+                conn.sendall(self.RELOAD_FRAME)
+            except OSError:
+                self._close(conn)
+
+    def _close(self, conn):
+        self._selector.unregister(conn)
+        self._handshakes.pop(conn, None)
+        self._clients.discard(conn)
+        conn.close()
 
 
 def start_dev_server(src_dir, dist_dir, config, port=8000, no_reload=False):
     """Start a development server with optional live reloading."""
-    # Initial build
-    build_project(src_dir, dist_dir, config, minify=False)
+    # Start WebSocket server for live reload next to the HTTP port
+    reload_server = None
+    if not no_reload:
+        reload_server = ReloadServer(port + 1)
+        try:
+            reload_server.start()
+        except OSError as e:
+            logging.error(
+                f"Could not start the live-reload server on port {port + 1}: {e}. "
+                "Choose another --port or pass --no-reload."
+            )
+            sys.exit(1)
+
+    # Initial build, with the reload script spliced into index.html
+    dependencies = build_project(
+        src_dir,
+        dist_dir,
+        config,
+        minify=False,
+        inject_reload=reload_server.script if reload_server else "",
+        parallel=False,
+    )
 
     # Set up file watcher
     observer = Observer()
-    watcher = FileWatcher(src_dir, dist_dir, config)
+    watcher = FileWatcher(src_dir, dist_dir, config, dependencies, reload_server)
     observer.schedule(watcher, src_dir, recursive=True)
     observer.start()
 
-    # Serve index.html with optional reload script
-    reload_script = (
-        ""
-        if no_reload
-        else """
-    <script>
-    let ws = new WebSocket(`ws://${location.host}`);
-    ws.onmessage = () => location.reload();
-    </script>
-    """
-    )
-    index_path = Path(dist_dir) / "pages" / "index.html"
-    if index_path.exists():
-        with open(index_path, "r", encoding="utf-8") as f:
-            content = f.read()
-        content = content.replace("</body>", f"{reload_script}</body>")
-        with open(index_path, "w", encoding="utf-8") as f:
-            f.write(content)
-
-    # Start WebSocket server for live reload
-    if not no_reload:
-
-        def ws_server():
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.bind(("localhost", port))
-                s.listen()
-                while True:
-                    conn, _ = s.accept()
-                    with conn:
-                        while True:
-                            data = conn.recv(1024)
-                            if not data:
-                                break
-                            conn.sendall(b"reload")
-
-        threading.Thread(target=ws_server, daemon=True).start()
-
-    # Start HTTP server
+    # Start HTTP server, resolving the served root once rather than per request
+    dist_root = str(Path(dist_dir).resolve())
     handler = lambda *args, **kwargs: DevServerHandler(
-        *args, dist_dir=dist_dir, **kwargs
+        *args, dist_dir=dist_root, **kwargs
     )
     with socketserver.TCPServer(("", port), handler) as httpd:
         logging.info(f"Serving at http://localhost:{port}")
-        webbrowser.open(f"http://localhost:{port}/pages/index.html")
+        webbrowser.open(f"http://localhost:{port}/index.html")
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
@@ -354,7 +769,10 @@ def main():
         "--no-reload", action="store_true", help="Disable live reloading in dev server"
     )
     parser.add_argument(
-        "--port", type=int, default=8000, help="Port for dev server (default: 8000)"
+        "--port",
+        type=int,
+        default=8000,
+        help="Port for dev server (default: 8000); live reload also uses port+1",
     )
     args = parser.parse_args()
 